@@ -0,0 +1,108 @@
+import os
+import time
+import queue
+import logging
+import threading
+from watchdog.events import FileSystemEventHandler
+
+# a file the periodic sweep finds is only queued once it was not modified for this long, it may still be copied
+SWEEP_SETTLE_SEC = 60
+
+
+class VideoQueue:
+    """
+    queue of video files waiting to be processed, a file that is already queued or in progress is not queued again
+    """
+    def __init__(self, supported_formats: tuple):
+        self.supported_formats = supported_formats
+        self.files = queue.Queue()
+        self.pending = set()
+        self.lock = threading.Lock()
+
+    def put(self, file_path: str) -> None:
+        """
+        queue a file if it is a supported video that is not already pending
+        :param file_path: full path of the file
+        :return: None
+        """
+        if not file_path.lower().endswith(self.supported_formats):
+            return
+
+        with self.lock:
+            if file_path in self.pending:
+                return
+            self.pending.add(file_path)
+
+        logging.info(f"queued {file_path} for processing")
+        self.files.put(file_path)
+
+    def get(self) -> str:
+        """
+        wait for the next file to process
+        :return: full path of the file
+        """
+        return self.files.get()
+
+    def done(self, file_path: str) -> None:
+        """
+        mark a file as finished, so it can be queued again if it shows up again
+        :param file_path: full path of the file
+        :return: None
+        """
+        with self.lock:
+            self.pending.discard(file_path)
+
+
+class NewVideoHandler(FileSystemEventHandler):
+    """
+    watchdog handler queueing files once they are completely written to (or moved into) the input folder
+    """
+    def __init__(self, video_queue: VideoQueue):
+        super().__init__()
+        self.video_queue = video_queue
+
+    def on_closed(self, event) -> None:
+        # IN_CLOSE_WRITE - the file was opened for writing and is now complete
+        if not event.is_directory:
+            self.video_queue.put(event.src_path)
+
+    def on_moved(self, event) -> None:
+        if not event.is_directory:
+            self.video_queue.put(event.dest_path)
+
+
+def sweep_input_folder(input_folder: str, video_queue: VideoQueue, settle_sec: float = 0) -> None:
+    """
+    queue all files currently in the input folder
+    :param input_folder: folder to scan
+    :param video_queue: queue of files to process
+    :param settle_sec: skip files modified less than this many seconds ago, 0 queues every file
+    :return: None
+    """
+    now = time.time()
+    for file in os.listdir(input_folder):
+        file_path = os.path.join(input_folder, file)
+        if settle_sec > 0:
+            try:
+                if now - os.stat(file_path).st_mtime < settle_sec:
+                    continue
+            except FileNotFoundError:
+                continue
+        video_queue.put(file_path)
+
+
+def sweep_loop(input_folder: str, video_queue: VideoQueue, interval_sec: float) -> None:
+    """
+    sweep the input folder forever on a fixed interval - safety net for mounts that don't deliver inotify events
+    :param input_folder: folder to scan
+    :param video_queue: queue of files to process
+    :param interval_sec: seconds between two sweeps
+    :return: None
+    """
+    while True:
+        time.sleep(interval_sec)
+        try:
+            # files that are still being written are left for a later sweep (or their close event)
+            sweep_input_folder(input_folder, video_queue, settle_sec=SWEEP_SETTLE_SEC)
+        except OSError as e:
+            logging.error(f"failed to sweep {input_folder} - {e}")
@@ -1,15 +1,24 @@
 import os
 import sys
-import time
+import errno
 import shutil
 import cv2
+import av
 import json
+import queue
 import logging
-import subprocess
+import threading
+import multiprocessing
 import redis
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 import hashlib
-from ultralytics import YOLO
+from watchdog.observers import Observer
 from postgres_wrapper import PostgresWrapper, VideoProcessingResultFields
+from pose_estimator import PoseEstimator, TritonPoseEstimator
+from video_reader import open_video_reader, FrameSampler
+from pose_writer import open_pose_writer
+from input_watcher import VideoQueue, NewVideoHandler, sweep_input_folder, sweep_loop
 
 # Load config
 with open("config.json", "r") as f:
@@ -21,43 +30,64 @@ logging.basicConfig(
     format="%(asctime)s [%(levelname)s] %(message)s",
 )
 
-model = YOLO(CONFIG["model_path"])
+# per worker process state, set up by init_worker
+pose_estimator = None
+worker_redis = None
+
+# read size used when hashing video files (4 MiB)
+HASH_CHUNK_SIZE = 1 << 22
+
+# expiry of the redis claim taken while a video is processed, so a crashed worker doesn't block it forever
+CLAIM_TTL_SEC = 86400
+
+# how often the main loop wakes up without results, to notice workers that failed to initialize
+RESULT_POLL_SEC = 1
 
 # all fields that MUST be present in the config.json file
 expected_config_keys = ['input_folder', 'pose_data_folder', 'processed_folder', 'scan_interval_sec', 'model_path',
-                        'supported_file_formats', 'db_table_name']
+                        'supported_file_formats', 'db_table_name', 'batch_size', 'imgsz',
+                        'use_tensorrt', 'use_nvdec', 'pose_output_format', 'num_workers', 'inference_backend',
+                        'triton_model_name', 'frame_stride', 'scene_diff_threshold', 'use_torch_compile',
+                        'max_people']
 
-def get_video_codec(video_path: str) -> str:
+def get_video_codec(cap: cv2.VideoCapture) -> str:
     """
-    extracts and returns the video codec if possible, N/A if error in process
-    :param video_path: full path of the video file
+    extracts and returns the video codec from the FOURCC of an opened capture if possible, N/A if error in process
+    :param cap: opened capture of the video file
     :return: video codec (i.e. h264 etc.) or N/A if an error occurs
     """
     try:
-        result = subprocess.run(
-            [
-                "ffprobe",
-                "-v", "error",
-                "-select_streams", "v:0",
-                "-show_entries", "stream=codec_name",
-                "-of", "json",
-                video_path
-            ],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True
-        )
-        info = json.loads(result.stdout)
-        codec = info["streams"][0]["codec_name"] if "streams" in info and info["streams"] else "N/A"
-        logging.info(f"code: {codec}")
-        return codec
+        fourcc = int(cap.get(cv2.CAP_PROP_FOURCC))
+        codec = bytes([(fourcc >> (8 * i)) & 0xff for i in range(4)]).decode(errors='ignore').strip('\x00 ')
+        return codec or "N/A"
     except Exception as e:
         logging.error(f"Failed to extract codec: {e}")
         return 'N/A'
 
-def extract_metadata(video_path: str) -> VideoProcessingResultFields:
+def probe_video_stream(video_path: str) -> tuple:
     """
-    extract and return video file metadata - filename, duration, resolution, frame rate, codec
+    read the video stream properties from the container header with PyAV, without decoding any frame
+    :param video_path: full path of the video file
+    :return: (frame rate, duration in seconds, width, height, codec)
+    """
+    with av.open(video_path, metadata_errors='ignore') as container:
+        stream = container.streams.video[0]
+        fps = float(stream.average_rate) if stream.average_rate else 0.0
+        if stream.duration and stream.time_base:
+            duration = float(stream.duration * stream.time_base)
+        elif container.duration:
+            duration = container.duration / av.time_base
+        else:
+            duration = stream.frames / fps if fps else 0
+
+        codec_context = stream.codec_context
+        return fps, duration, codec_context.width, codec_context.height, codec_context.name
+
+def extract_metadata(cap: cv2.VideoCapture, video_path: str) -> VideoProcessingResultFields:
+    """
+    extract and return video file metadata - filename, duration, resolution, frame rate, codec.
+    the metadata is read from the container header with PyAV, the opened capture is only used if that fails.
+    :param cap: opened capture of the video file
     :param video_path: full path of the video file
     :return: dict containing video metadata
     """
@@ -65,25 +95,28 @@ def extract_metadata(video_path: str) -> VideoProcessingResultFields:
     metadata = VideoProcessingResultFields(filename)
 
     try:
-        cap = cv2.VideoCapture(video_path)
+        try:
+            fps, duration, width, height, codec = probe_video_stream(video_path)
+        except Exception as e:
+            logging.info(f"PyAV probe failed for {video_path}, using OpenCV properties - {e}")
+            fps = cap.get(cv2.CAP_PROP_FPS)
+            frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            duration = frame_count / fps if fps else 0
+            width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+            height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            codec = get_video_codec(cap)
 
-        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        fps = cap.get(cv2.CAP_PROP_FPS)
         logging.info(f"Frame rate: {fps:.2f} FPS")
         metadata.frame_rate = f'{fps:.2f}'
 
-        duration = frame_count / fps if fps else 0
         logging.info(f"Duration: {duration:.2f} seconds")
         metadata.duration_seconds = duration
 
-        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
         logging.info(f"resolution: {width} x {height}")
         metadata.resolution = f'{width} x {height}'
 
-        metadata.codec = get_video_codec(video_path)
-
-        cap.release()
+        logging.info(f"code: {codec}")
+        metadata.codec = codec
     except Exception as e:
         logging.error(f"error while trying to extract metadata for file {video_path} - {e}")
     else:
@@ -91,67 +124,123 @@ def extract_metadata(video_path: str) -> VideoProcessingResultFields:
     finally:
         return metadata
 
-def is_corrupted(video_path: str) -> bool:
+def run_pose_batch(batch: list, writer) -> None:
     """
-    check if video is corrupted or not
-    :param video_path: full path of the video file
-    :return: True if video is corrupted, False otherwise
+    runs the pose model once over a batch of frames and writes one entry per frame
+    :param batch: list of (frame index, frame) tuples read from the video
+    :param writer: pose data writer of the video
+    :return: None
     """
-    corrupted = True
-    cap = cv2.VideoCapture(video_path)
-
-    if not cap.isOpened():
-        logging.info("Failed to open video. It may be corrupted or unsupported.")
-    else:
-        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        success, frame = cap.read()
-        if not success or frame is None:
-            logging.info("Unable to read frames. Video may be corrupted.")
-        else:
-            logging.info(f"Video opened successfully. Frame count: {frame_count}")
-            corrupted = False
+    frame_indices = [frame_index for frame_index, _ in batch]
+    keypoints = pose_estimator.predict([frame for _, frame in batch])
+    for frame_index, frame_keypoints in zip(frame_indices, keypoints):
+        writer.write(frame_index, frame_keypoints)
 
-    cap.release()
-    return corrupted
-
-def pose_detection(video_path: str) -> str:
+def pose_detection(video_path: str, cap: cv2.VideoCapture, first_frame) -> str:
     """
-    runs a pose detection using YOLOv11n pose model on the video file, and stores the data in a json file.
+    runs a pose detection using YOLOv11n pose model on the video file, and stores the data in a npz or jsonl file.
     :param video_path: full path of the video file
-    :return: the path to the json file containing the pose data
+    :param cap: opened capture of the video file, positioned after first_frame
+    :param first_frame: first frame of the video, already read while probing for corruption
+    :return: the path to the file containing the pose data
     """
     filename = os.path.basename(video_path)
     name, _ = os.path.splitext(filename)
-    json_path = 'N/A'
+    pose_path = 'N/A'
+    reader = None
 
     try:
-        cap = cv2.VideoCapture(video_path)
-        pose_data = []
-        frame_count = 0
-
-        while cap.isOpened():
-            ret, frame = cap.read()
-            if not ret:
-                break
+        # every frame_stride-th frame is kept at most
+        expected_frames = -(-int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) // max(1, CONFIG["frame_stride"]))
+        writer = open_pose_writer(CONFIG["pose_output_format"],
+                                  os.path.join(CONFIG["pose_data_folder"], f"{name}_pose"), pose_estimator.kpt_shape,
+                                  expected_frames, CONFIG["max_people"])
+        pose_path = writer.file_path
+        sampler = FrameSampler(CONFIG["frame_stride"], CONFIG["scene_diff_threshold"])
+        buf = []
+
+        # frames are decoded in a background thread while the previous batch is on the gpu
+        reader = open_video_reader(video_path, cap, first_frame, 2 * CONFIG["batch_size"], CONFIG["use_nvdec"])
+        with reader, writer:
+            for frame_index, frame in reader:
+                if not sampler.keep(frame_index, frame):
+                    continue
+
+                # the original frame index is kept, so skipped frames don't shift the timing
+                buf.append((frame_index, frame))
+                if len(buf) == CONFIG["batch_size"]:
+                    run_pose_batch(buf, writer)
+                    buf = []
+
+            # flush the last partial batch
+            if buf:
+                run_pose_batch(buf, writer)
 
-            results = model.predict(source=frame, task='pose', conf=0.25)
-            frame_info = {
-                "frame": frame_count,
-                "keypoints": [kp.tolist() for kp in results[0].keypoints.data]
-            }
-            pose_data.append(frame_info)
-            frame_count += 1
-
-        cap.release()
         logging.info(f"pose detection process for file {video_path} finished successfully.")
     except Exception as e:
         logging.error(f'unable to perform pose detection on video {video_path} - {e}')
+        if reader is None:
+            # the reader never took ownership of the capture
+            cap.release()
+        # don't leave a partially written pose file behind
+        if pose_path != 'N/A' and os.path.exists(pose_path):
+            os.remove(pose_path)
+        pose_path = 'N/A'
+
+    return pose_path
+
+def process_video(video_path: str) -> VideoProcessingResultFields:
+    """
+    extract metadata, check for corruption and run pose detection on a video, opening it only once
+    :param video_path: full path of the video file
+    :return: VideoProcessingResultFields with all fields filled
+    """
+    filename = os.path.basename(video_path)
+    cap = cv2.VideoCapture(video_path, cv2.CAP_FFMPEG)
+    metadata = extract_metadata(cap, video_path)
+    metadata.corrupted = True
+
+    # reading the first frame is the corruption probe - the frame is kept as the first inference frame
+    if not cap.isOpened():
+        logging.info("Failed to open video. It may be corrupted or unsupported.")
+    else:
+        success, first_frame = cap.read()
+        if not success or first_frame is None:
+            logging.info("Unable to read frames. Video may be corrupted.")
+        else:
+            logging.info(f"Video opened successfully. Frame count: {int(cap.get(cv2.CAP_PROP_FRAME_COUNT))}")
+            metadata.corrupted = False
+
+    if metadata.corrupted:
+        logging.info(f'{filename} is corrupted. will not perform pose detection.')
+        cap.release()
     else:
-        json_path = os.path.join(CONFIG["pose_data_folder"], f"{name}_pose.json")
-        with open(json_path, "w") as f:
-            json.dump(pose_data, f, indent=2)
+        # the frame reader takes ownership of the capture and releases it
+        metadata.pose_file_path = pose_detection(video_path, cap, first_frame)
+
+    return metadata
+
+def compute_file_hash(file_path: str) -> str:
+    """
+    compute the md5 hash of a file, streaming it in chunks instead of loading it into memory
+    :param file_path: full path of the file
+    :return: hex digest of the file content
+    """
+    file_hash = hashlib.md5()
+    with open(file_path, 'rb', buffering=0) as fp:
+        for chunk in iter(lambda: fp.read(HASH_CHUNK_SIZE), b''):
+            file_hash.update(chunk)
+
+    return file_hash.hexdigest()
 
-    return json_path
+def file_stat_key(file_path: str) -> str:
+    """
+    cheap identity key for a file, checked in redis before paying for a full content hash
+    :param file_path: full path of the file
+    :return: key in the form size:mtime:name
+    """
+    stat = os.stat(file_path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}:{os.path.basename(file_path)}"
 
 def move_processed_file(video_path: str) -> None:
     """
@@ -162,7 +251,13 @@ def move_processed_file(video_path: str) -> None:
     try:
         filename = os.path.basename(video_path)
         destination = os.path.join(CONFIG["processed_folder"], filename)
-        shutil.move(video_path, destination)
+        try:
+            # a single rename syscall when both folders are on the same filesystem
+            os.replace(video_path, destination)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            shutil.move(video_path, destination)
     except FileNotFoundError:
         logging.error(f"File not found: {video_path}")
     except PermissionError:
@@ -174,6 +269,177 @@ def move_processed_file(video_path: str) -> None:
     else:
         logging.info(f"moved {filename} to {destination}")
 
+def connect_redis() -> redis.Redis:
+    """
+    create a redis connection from the REDIS_HOST and REDIS_PORT environment variables
+    :return: redis connection
+    """
+    return redis.Redis(host=os.getenv("REDIS_HOST", "localhost"), port=int(os.getenv("REDIS_PORT", 6379)),
+                       decode_responses=True)
+
+def claim_key(file_path: str) -> str:
+    """
+    redis key pointing from a file to the content hash a worker claimed for it,
+    so the claim can be released by path if the worker dies
+    :param file_path: full path of the file
+    :return: key in the form claim:path
+    """
+    return f"claim:{file_path}"
+
+def release_claim(redis_con: redis.Redis, file_path: str) -> None:
+    """
+    drop the claim a dead worker left for a file, so the file is processed again on the next sweep
+    :param redis_con: redis connection
+    :param file_path: full path of the file
+    :return: None
+    """
+    file_hash = redis_con.get(claim_key(file_path))
+    if file_hash is not None and redis_con.get(file_hash) == "processing":
+        redis_con.delete(file_hash)
+    redis_con.delete(claim_key(file_path))
+
+def release_stale_claims(redis_con: redis.Redis) -> None:
+    """
+    drop the claims left behind by workers of a previous run that was killed mid-video,
+    must only run before the worker pool is started - no claim can be alive then
+    :param redis_con: redis connection
+    :return: None
+    """
+    prefix = claim_key("")
+    for key in redis_con.scan_iter(match=f"{prefix}*"):
+        file_path = key[len(prefix):]
+        logging.info(f"releasing stale claim of {file_path}")
+        release_claim(redis_con, file_path)
+
+def init_worker(init_failed) -> None:
+    """
+    initializer of the worker processes - load the pose model (or connect to triton) and connect to redis
+    :param init_failed: event set if the initialization fails, so the main process exits instead of
+                        restarting workers that can never start
+    :return: None
+    """
+    global pose_estimator, worker_redis
+
+    try:
+        if CONFIG["inference_backend"] == "triton":
+            pose_estimator = TritonPoseEstimator(os.getenv("TRITON_URL", "localhost:8001"),
+                                                 CONFIG["triton_model_name"], CONFIG["batch_size"], CONFIG["imgsz"])
+        else:
+            pose_estimator = PoseEstimator(CONFIG["model_path"], CONFIG["batch_size"], CONFIG["imgsz"],
+                                           use_tensorrt=CONFIG["use_tensorrt"],
+                                           use_torch_compile=CONFIG["use_torch_compile"])
+        pose_estimator.warmup()
+
+        worker_redis = connect_redis()
+        worker_redis.ping()
+    except Exception as e:
+        logging.error(f"failed to initialize worker - {e}")
+        init_failed.set()
+        raise
+
+def worker(full_path: str):
+    """
+    process a single file from the input folder in a worker process - skip it if already processed,
+    otherwise run the video processing on it - and move it to the processed folder.
+    :param full_path: full path of the file
+    :return: VideoProcessingResultFields of the processed video, None if it was skipped or failed
+    """
+    if not os.path.exists(full_path):
+        # already handled through another event for the same file
+        return None
+
+    file = os.path.basename(full_path)
+    video_metadata = None
+    should_process = True
+    should_move = True
+    claimed = False
+    try:
+        logging.info(f"*** got new file to process - {file} ***")
+
+        # check if video has already been processed - first by size/mtime/name, then by content hash
+        stat_key = file_stat_key(full_path)
+        if worker_redis.exists(stat_key):
+            logging.info(f"for file {file}, {stat_key} already processed. skipping...")
+            should_process = False
+        else:
+            file_hash = compute_file_hash(full_path)
+            # atomic claim - fails if the hash was already processed or another worker is processing it
+            claimed = worker_redis.set(file_hash, "processing", nx=True, ex=CLAIM_TTL_SEC)
+            if claimed:
+                worker_redis.set(claim_key(full_path), file_hash, ex=CLAIM_TTL_SEC)
+            else:
+                should_process = False
+                if worker_redis.get(file_hash) == "processing":
+                    # another worker has it, or a worker died on it - keep it in place so it is retried
+                    # once the claim is released or expires, instead of moving a file that was never processed
+                    logging.info(f"for file {file}, hash {file_hash} is still in progress. leaving it in place...")
+                    should_move = False
+                else:
+                    logging.info(f"for file {file}, hash {file_hash} already processed. skipping...")
+
+        if should_process:
+            video_metadata = process_video(full_path)
+    except Exception as e:
+        logging.error(f"error while trying to process {file} - {e}")
+        video_metadata = None
+        if claimed:
+            # release the claim so the same content can be processed again later
+            worker_redis.delete(file_hash, claim_key(full_path))
+    else:
+        if should_process:
+            logging.info(f'finished processing {file}')
+            # store file hash and stat key in redis in a single round trip
+            with worker_redis.pipeline() as pipe:
+                pipe.set(file_hash, "processed")
+                pipe.set(stat_key, "processed")
+                pipe.delete(claim_key(full_path))
+                pipe.execute()
+    finally:
+        if should_move:
+            move_processed_file(full_path)
+
+    return video_metadata
+
+def dispatch_loop(video_queue: VideoQueue, create_pool, result_queue: queue.Queue) -> None:
+    """
+    hand queued files over to the worker pool forever, collecting the results in result_queue.
+    if a worker process dies the pool is broken - the files it had are released and a new pool is created
+    :param video_queue: queue of files to process
+    :param create_pool: function creating a new ProcessPoolExecutor of worker processes
+    :param result_queue: queue receiving the VideoProcessingResultFields of processed videos
+    :return: None
+    """
+    redis_con = connect_redis()
+    pool = create_pool()
+
+    def on_done(future, full_path):
+        video_queue.done(full_path)
+        try:
+            video_metadata = future.result()
+        except BrokenProcessPool:
+            logging.error(f"worker process died while processing {full_path}, releasing it...")
+            try:
+                release_claim(redis_con, full_path)
+            except Exception as e:
+                logging.error(f"failed to release the claim of {full_path} - {e}")
+        except Exception as e:
+            logging.error(f"unexpected error in worker while processing {full_path} - {e}")
+        else:
+            if video_metadata is not None:
+                result_queue.put(video_metadata)
+
+    while True:
+        full_path = video_queue.get()
+        try:
+            future = pool.submit(worker, full_path)
+        except BrokenProcessPool:
+            logging.error("worker pool is broken, starting a new one...")
+            pool.shutdown(wait=False, cancel_futures=True)
+            pool = create_pool()
+            future = pool.submit(worker, full_path)
+
+        future.add_done_callback(lambda done_future, full_path=full_path: on_done(done_future, full_path))
+
 def init_config() -> bool:
     """
     check that config.json has all necessary parameters in order to run the script.
@@ -185,6 +451,13 @@ def init_config() -> bool:
             logging.error(f"config.json file missing required key: {key}")
             response = False
 
+    # values that would otherwise only fail once per video
+    allowed_values = {"pose_output_format": ("npz", "jsonl"), "inference_backend": ("local", "triton")}
+    for key, allowed in allowed_values.items():
+        if key in CONFIG and CONFIG[key] not in allowed:
+            logging.error(f"config.json key {key} must be one of {', '.join(allowed)}, got: {CONFIG[key]}")
+            response = False
+
     return response
 
 
@@ -203,46 +476,53 @@ if __name__ == "__main__":
     # create connection with postgresql
     db_con = PostgresWrapper()
 
-    # Connect to Redis
-    r = redis.Redis(host=os.getenv("REDIS_HOST", "localhost"), port=int(os.getenv("REDIS_PORT", 6379)), decode_responses=True)
+    # a previous run may have been stopped while its workers held claims, the files would be blocked until they expire
+    try:
+        release_stale_claims(connect_redis())
+    except redis.RedisError as e:
+        logging.error(f"failed to release stale claims - {e}")
+
+    # worker processes do decode, hashing, inference and writing - spawned, since cuda can't be used after fork
+    mp_context = multiprocessing.get_context("spawn")
+    worker_init_failed = mp_context.Event()
+
+    def create_pool() -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=CONFIG["num_workers"], mp_context=mp_context,
+                                   initializer=init_worker, initargs=(worker_init_failed,))
+
+    video_queue = VideoQueue(supported_formats)
+    result_queue = queue.Queue()
+    threading.Thread(target=dispatch_loop, args=(video_queue, create_pool, result_queue), daemon=True,
+                     name="dispatcher").start()
+
+    # get notified as soon as a file is completely written to the input folder, instead of polling it
+    observer = Observer()
+    observer.schedule(NewVideoHandler(video_queue), CONFIG["input_folder"], recursive=False)
+    observer.start()
+    logging.info(f"watching {CONFIG['input_folder']} for new videos...")
+
+    # pick up files that were already waiting before the observer started, then keep sweeping on a timer
+    # independent of the results, for mounts that don't deliver inotify events
+    sweep_input_folder(CONFIG["input_folder"], video_queue)
+    threading.Thread(target=sweep_loop, args=(CONFIG["input_folder"], video_queue, CONFIG["scan_interval_sec"]),
+                     daemon=True, name="sweeper").start()
 
     while True:
-        logging.info("Scanning for new videos...")
-
-        for file in os.listdir(CONFIG["input_folder"]):
-            if file.lower().endswith(supported_formats):
-                should_process = True
-                full_path = os.path.join(CONFIG["input_folder"], file)
-                try:
-                    logging.info(f"*** got new file to process - {file} ***")
-
-                    # check if video has already been processed
-                    file_hash = hashlib.md5(open(full_path, 'rb').read()).hexdigest()
-                    if r.exists(file_hash):
-                        logging.info(f"for file {file}, hash {file_hash} already processed. skipping...")
-                        should_process = False
-
-                    if should_process:
-                        video_metadata = extract_metadata(full_path)
-
-                        if not is_corrupted(full_path):
-                            video_metadata.pose_file_path = pose_detection(full_path)
-                            video_metadata.corrupted = False
-                        else:
-                            logging.info(f'{file} is corrupted. will not perform pose detection.')
-                            video_metadata.corrupted = True
-
-                        if db_con.is_connected:
-                            db_con.db_insert(db_table= CONFIG["db_table_name"], row_data= video_metadata)
-                except Exception as e:
-                    logging.error(f"error while trying to process {file} - {e}")
-                else:
-                    if should_process:
-                        logging.info(f'finished processing {file}')
-                        # store file hash in redis
-                        r.set(file_hash, "processed")
-                finally:
-                    move_processed_file(full_path)
-
-        logging.info(f"Waiting {CONFIG['scan_interval_sec']} seconds...")
-        time.sleep(CONFIG["scan_interval_sec"])
+        if worker_init_failed.is_set():
+            logging.error("worker processes failed to initialize, please check the model and services. exiting...")
+            sys.exit(1)
+
+        try:
+            processed_rows = [result_queue.get(timeout=RESULT_POLL_SEC)]
+        except queue.Empty:
+            continue
+
+        # whatever else finished in the meantime goes into the same database batch
+        while True:
+            try:
+                processed_rows.append(result_queue.get_nowait())
+            except queue.Empty:
+                break
+
+        if db_con.is_connected:
+            db_con.db_insert_many(db_table= CONFIG["db_table_name"], rows= processed_rows)
@@ -0,0 +1,295 @@
+import os
+import time
+import fcntl
+import logging
+import cv2
+import numpy as np
+import torch
+import torch.nn.functional as F
+from ultralytics import YOLO
+from ultralytics.nn.autobackend import AutoBackend
+from ultralytics.utils import ops
+
+# optional remote inference through Triton Inference Server
+try:
+    import tritonclient.grpc as grpcclient
+except ImportError:
+    grpcclient = None
+
+# how long to wait for the triton server to load the model, building the TensorRT accelerated model takes a while
+TRITON_READY_TIMEOUT_SEC = 600
+
+
+class PoseEstimator:
+    """
+    wrapper class for running the YOLO pose network directly on preprocessed frame batches,
+    bypassing the per call argument parsing and Results objects of model.predict
+    """
+    def __init__(self, model_path: str, batch_size: int, imgsz: int = 640, conf: float = 0.25, iou: float = 0.7,
+                 use_tensorrt: bool = False, use_torch_compile: bool = False):
+        self.setup(batch_size, imgsz, conf, iou, torch.device("cuda" if torch.cuda.is_available() else "cpu"))
+        # the input shape never changes, let cudnn pick the fastest kernels for it once
+        torch.backends.cudnn.benchmark = True
+
+        model = YOLO(model_path)
+        if use_tensorrt and self.device.type != "cuda":
+            logging.warning("TensorRT requested but CUDA is not available, falling back to PyTorch")
+            use_tensorrt = False
+
+        if use_tensorrt:
+            self.net = AutoBackend(self.tensorrt_engine(model, model_path), device=self.device, fp16=True).eval()
+        else:
+            model.fuse()
+            self.net = model.model.to(self.device).eval()
+            if self.half:
+                self.net.half()
+        self.kpt_shape = tuple(self.net.kpt_shape)
+        self.num_classes = len(self.net.names)
+
+        # cuda graphs replay the whole network in one launch, but only for the exact shape they were captured with
+        self.compiled = use_torch_compile and not use_tensorrt and self.device.type == "cuda"
+        if self.compiled:
+            self.net = torch.compile(self.net, mode='reduce-overhead', fullgraph=False)
+        self.static_batch = self.compiled
+        logging.info(f"loaded pose model {model_path} on {self.device} (fp16: {self.half}, compiled: {self.compiled})")
+        self.allocate_buffers()
+
+    def setup(self, batch_size: int, imgsz: int, conf: float, iou: float, device: torch.device) -> None:
+        """
+        set the batching and postprocessing parameters shared by all estimators,
+        the network specific attributes (kpt_shape, num_classes, compiled) are set by the caller afterwards
+        :param batch_size: maximum number of frames per batch
+        :param imgsz: side of the square network input
+        :param conf: confidence threshold of the detections
+        :param iou: iou threshold of the non max suppression
+        :param device: device the batches are prepared on
+        :return: None
+        """
+        self.batch_size = batch_size
+        self.imgsz = imgsz
+        self.conf = conf
+        self.iou = iou
+        self.device = device
+        self.half = device.type == "cuda"
+        self.compiled = False
+        self.static_batch = False
+
+    def allocate_buffers(self) -> None:
+        """
+        allocate the buffers the letterboxed batches are staged in
+        :return: None
+        """
+        # staging buffer for the letterboxed batch, pinned so the copy to the gpu is asynchronous
+        self.host_buffer = torch.empty((self.batch_size, 3, self.imgsz, self.imgsz), dtype=torch.uint8,
+                                       pin_memory=self.device.type == "cuda")
+        self.host_view = self.host_buffer.numpy()
+        # same buffer on the gpu, for frames that were already decoded there (NVDEC)
+        self.device_buffer = None
+        # one stream reused by all batches for the copy, the network and the postprocessing
+        self.stream = torch.cuda.Stream(device=self.device) if self.device.type == "cuda" else None
+
+    def tensorrt_engine(self, model: YOLO, model_path: str) -> str:
+        """
+        return the path of a cached TensorRT fp16 engine for the model, exporting it if it does not exist yet
+        :param model: loaded YOLO model
+        :param model_path: path of the PyTorch weights the engine is built from
+        :return: full path of the engine file
+        """
+        stem, _ = os.path.splitext(model_path)
+        # batch and imgsz are baked into the engine profile, so they are part of the cache key
+        engine_path = f"{stem}_b{self.batch_size}_{self.imgsz}.engine"
+        # all workers start at once and the export always writes next to the weights, only one may build it
+        with open(f"{engine_path}.lock", 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            if not os.path.exists(engine_path):
+                logging.info(f"exporting {model_path} to TensorRT engine {engine_path}")
+                exported_path = model.export(format='engine', half=True, imgsz=self.imgsz, batch=self.batch_size,
+                                             dynamic=True, verbose=False)
+                os.replace(exported_path, engine_path)
+
+        return engine_path
+
+    def letterbox_geometry(self, height: int, width: int) -> tuple:
+        """
+        compute how a frame is resized and padded to fit the square network input
+        :param height: frame height
+        :param width: frame width
+        :return: (gain, resized width, resized height, left padding, top padding)
+        """
+        gain = min(self.imgsz / height, self.imgsz / width)
+        new_w, new_h = round(width * gain), round(height * gain)
+        left, top = (self.imgsz - new_w) // 2, (self.imgsz - new_h) // 2
+        return gain, new_w, new_h, left, top
+
+    def letterbox(self, frame: np.ndarray, slot: int) -> tuple:
+        """
+        resize a BGR frame keeping its aspect ratio and write it as BGR CHW into the staging buffer,
+        the channels are swapped to RGB once for the whole batch on the gpu
+        :param frame: BGR frame as read by cv2
+        :param slot: index inside the staging buffer
+        :return: (gain, left padding, top padding) needed to map keypoints back to the frame
+        """
+        gain, new_w, new_h, left, top = self.letterbox_geometry(*frame.shape[:2])
+
+        resized = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+        self.host_view[slot] = 114
+        self.host_view[slot, :, top:top + new_h, left:left + new_w] = resized.transpose(2, 0, 1)
+
+        return gain, left, top
+
+    def letterbox_tensor(self, frame: torch.Tensor, slot: int) -> tuple:
+        """
+        resize an RGB CHW frame that is already on the gpu and write it into the device buffer
+        :param frame: RGB CHW uint8 cuda tensor
+        :param slot: index inside the device buffer
+        :return: (gain, left padding, top padding) needed to map keypoints back to the frame
+        """
+        if self.device_buffer is None:
+            self.device_buffer = torch.empty_like(self.host_buffer, device=self.device)
+
+        gain, new_w, new_h, left, top = self.letterbox_geometry(*frame.shape[-2:])
+
+        resized = F.interpolate(frame[None].float(), size=(new_h, new_w), mode='bilinear', align_corners=False)
+        self.device_buffer[slot] = 114
+        self.device_buffer[slot, :, top:top + new_h, left:left + new_w] = resized[0].round_().clamp_(0, 255)
+
+        return gain, left, top
+
+    def warmup(self) -> None:
+        """
+        run a full dummy batch through the network, so cuda context setup and kernel selection
+        happen at startup instead of on the first video
+        :return: None
+        """
+        self.predict([np.zeros((self.imgsz, self.imgsz, 3), dtype=np.uint8)] * self.batch_size)
+        logging.info("pose model warmed up")
+
+    def forward(self, batch: torch.Tensor) -> torch.Tensor:
+        """
+        run the network on a preprocessed batch
+        :param batch: (batch, 3, imgsz, imgsz) normalized input tensor on self.device
+        :return: raw prediction of the pose head
+        """
+        if self.compiled:
+            # the previous batch's graph outputs are fully consumed, they may be overwritten
+            torch.compiler.cudagraph_mark_step_begin()
+        return self.net(batch)
+
+    def predict(self, frames: list) -> list:
+        """
+        run the pose network once over a batch of frames
+        :param frames: list of at most batch_size frames, either BGR HWC numpy arrays as read by cv2
+                       or RGB CHW uint8 cuda tensors as decoded by NVDEC
+        :return: per frame (people, keypoints, 3) float16 array of [x, y, confidence]
+        """
+        count = len(frames)
+        on_device = isinstance(frames[0], torch.Tensor)
+        # a partial batch is padded with the stale slots of the buffer when the network needs a fixed shape
+        run_size = self.batch_size if self.static_batch else count
+        if self.stream is not None:
+            # frames decoded on the gpu were produced on the default stream
+            self.stream.wait_stream(torch.cuda.current_stream(self.device))
+
+        with torch.inference_mode(), torch.cuda.stream(self.stream):
+            if on_device:
+                letterbox_params = [self.letterbox_tensor(frame, slot) for slot, frame in enumerate(frames)]
+                batch = self.device_buffer[:run_size]
+            else:
+                letterbox_params = [self.letterbox(frame, slot) for slot, frame in enumerate(frames)]
+                # BGR -> RGB in a single op over the whole batch
+                batch = self.host_buffer[:run_size].to(self.device, non_blocking=True).flip(1)
+            batch = batch.half() if self.half else batch.float()
+            batch /= 255
+            preds = self.forward(batch)
+            detections = ops.non_max_suppression(preds, self.conf, self.iou, nc=self.num_classes)[:count]
+
+            # map the keypoints of all detections in the batch back to frame coordinates at once
+            people_per_frame = [len(det) for det in detections]
+            kpts = torch.cat([det[:, 6:] for det in detections]).view(-1, *self.kpt_shape).float()
+            frame_sizes = [frame.shape[-2:] if on_device else frame.shape[:2] for frame in frames]
+            params = torch.tensor([(gain, left, top, width, height) for (gain, left, top), (height, width)
+                                   in zip(letterbox_params, frame_sizes)], dtype=torch.float32, device=kpts.device)
+            params = params.repeat_interleave(torch.tensor(people_per_frame, device=kpts.device), dim=0)[:, None]
+            kpts[..., 0] = torch.minimum(((kpts[..., 0] - params[..., 1]) / params[..., 0]).clamp_(min=0), params[..., 3])
+            kpts[..., 1] = torch.minimum(((kpts[..., 1] - params[..., 2]) / params[..., 0]).clamp_(min=0), params[..., 4])
+
+            # a single device to host copy for the whole batch
+            keypoints = kpts.half().cpu().numpy()
+
+        return np.split(keypoints, np.cumsum(people_per_frame)[:-1])
+
+
+class TritonPoseEstimator(PoseEstimator):
+    """
+    pose estimator that keeps pre and post processing local but sends the network input to a
+    Triton Inference Server, whose dynamic batching merges the batches of all workers into larger gpu batches
+    """
+    def __init__(self, triton_url: str, model_name: str, batch_size: int, imgsz: int = 640, conf: float = 0.25,
+                 iou: float = 0.7, kpt_shape: tuple = (17, 3), num_classes: int = 1,
+                 ready_timeout_sec: float = TRITON_READY_TIMEOUT_SEC):
+        if grpcclient is None:
+            raise RuntimeError("tritonclient is not installed")
+
+        # the server owns the gpu, batches are prepared and decoded on the cpu
+        self.setup(batch_size, imgsz, conf, iou, torch.device("cpu"))
+        self.kpt_shape = tuple(kpt_shape)
+        self.num_classes = num_classes
+
+        self.model_name = model_name
+        self.client = grpcclient.InferenceServerClient(url=triton_url)
+        self.wait_until_ready(ready_timeout_sec)
+        self.check_model_metadata()
+        logging.info(f"using pose model {model_name} served by triton at {triton_url}")
+        self.allocate_buffers()
+
+    def wait_until_ready(self, timeout_sec: float) -> None:
+        """
+        wait for the triton server to be up and serving the model, it may still be starting with the app
+        :param timeout_sec: maximum seconds to wait
+        :return: None
+        """
+        deadline = time.monotonic() + timeout_sec
+        while True:
+            try:
+                if self.client.is_server_ready() and self.client.is_model_ready(self.model_name):
+                    return
+            except Exception as e:
+                # the server is not accepting connections yet
+                logging.debug(f"triton not reachable yet - {e}")
+
+            if time.monotonic() >= deadline:
+                raise RuntimeError(f"triton model {self.model_name} not ready after {timeout_sec} seconds")
+            logging.info(f"waiting for triton model {self.model_name} to be ready...")
+            time.sleep(2)
+
+    def check_model_metadata(self) -> None:
+        """
+        make sure the served model matches imgsz and the expected pose head, the shapes of the triton
+        model configuration are fixed and a mismatch would otherwise only fail on the first batch
+        :return: None
+        """
+        metadata = self.client.get_model_metadata(self.model_name)
+        inputs = {tensor.name: list(tensor.shape) for tensor in metadata.inputs}
+        outputs = {tensor.name: list(tensor.shape) for tensor in metadata.outputs}
+
+        if inputs.get("images", [])[-3:] != [3, self.imgsz, self.imgsz]:
+            raise ValueError(f"triton model {self.model_name} input 'images' has shape {inputs.get('images')}, "
+                             f"expected [-1, 3, {self.imgsz}, {self.imgsz}] - check imgsz in config.json")
+
+        channels = 4 + self.num_classes + int(np.prod(self.kpt_shape))
+        output_shape = outputs.get("output0", [])
+        if len(output_shape) < 2 or output_shape[-2] != channels:
+            raise ValueError(f"triton model {self.model_name} output 'output0' has shape {output_shape}, "
+                             f"expected {channels} channels for {self.num_classes} classes "
+                             f"and keypoints of shape {self.kpt_shape}")
+
+    def forward(self, batch: torch.Tensor) -> torch.Tensor:
+        """
+        run the network on a preprocessed batch through the triton server
+        :param batch: (batch, 3, imgsz, imgsz) normalized float32 input tensor
+        :return: raw prediction of the pose head
+        """
+        images = grpcclient.InferInput("images", list(batch.shape), "FP32")
+        images.set_data_from_numpy(batch.numpy())
+        result = self.client.infer(self.model_name, [images], outputs=[grpcclient.InferRequestedOutput("output0")])
+        return torch.from_numpy(result.as_numpy("output0")).float()
@@ -0,0 +1,125 @@
+import numpy as np
+import orjson
+
+# number of frames the npz buffers grow by when the expected frame count is exceeded
+FRAMES_GROW_STEP = 1024
+
+
+class JsonlPoseWriter:
+    """
+    streams pose data to disk as NDJSON - one {"frame", "keypoints"} object per line,
+    written as soon as the frame's batch is done instead of holding the whole video in memory
+    """
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.file = open(file_path, "wb")
+
+    def write(self, frame_index: int, keypoints: np.ndarray) -> None:
+        """
+        write the pose data of a single frame
+        :param frame_index: index of the frame in the video
+        :param keypoints: (people, keypoints, 3) array of [x, y, confidence]
+        :return: None
+        """
+        frame_info = {
+            "frame": frame_index,
+            "keypoints": keypoints
+        }
+        self.file.write(orjson.dumps(frame_info, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_APPEND_NEWLINE))
+
+    def close(self) -> None:
+        """
+        flush and close the output file
+        :return: None
+        """
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class NpzPoseWriter:
+    """
+    collects the pose data of a video in preallocated structure of arrays and saves it as a single compressed
+    npz file: the index in the video of every stored frame, the number of people detected in it, and one
+    (frames, max people, keypoints, 3) float16 keypoint array, padded with zeros for frames with fewer people
+    """
+    def __init__(self, file_path: str, kpt_shape: tuple = (17, 3), expected_frames: int = 0, max_people: int = 4):
+        self.file_path = file_path
+        self.kpt_shape = tuple(kpt_shape)
+        self.count = 0
+        self.allocate(max(expected_frames, FRAMES_GROW_STEP), max(max_people, 1))
+
+    def allocate(self, frames: int, people: int) -> None:
+        """
+        (re)allocate the arrays for the given number of frames and people, keeping the frames written so far
+        :param frames: capacity in frames
+        :param people: capacity in people per frame
+        :return: None
+        """
+        frame = np.zeros(frames, dtype=np.int32)
+        num_people = np.zeros(frames, dtype=np.int16)
+        kp = np.zeros((frames, people, *self.kpt_shape), dtype=np.float16)
+        if self.count:
+            frame[:self.count] = self.frame[:self.count]
+            num_people[:self.count] = self.num_people[:self.count]
+            kp[:self.count, :self.kp.shape[1]] = self.kp[:self.count]
+        self.frame, self.num_people, self.kp = frame, num_people, kp
+
+    def write(self, frame_index: int, keypoints: np.ndarray) -> None:
+        """
+        add the pose data of a single frame
+        :param frame_index: index of the frame in the video
+        :param keypoints: (people, keypoints, 3) array of [x, y, confidence]
+        :return: None
+        """
+        people = keypoints.shape[0]
+        frames_capacity, people_capacity = self.kp.shape[:2]
+        if self.count == frames_capacity or people > people_capacity:
+            # frame count from the container was off, or more people than expected - grow in chunks
+            self.allocate(frames_capacity + FRAMES_GROW_STEP if self.count == frames_capacity else frames_capacity,
+                          max(people, people_capacity))
+
+        self.frame[self.count] = frame_index
+        self.num_people[self.count] = people
+        self.kp[self.count, :people] = keypoints
+        self.count += 1
+
+    def close(self) -> None:
+        """
+        save the written frames to the npz file
+        :return: None
+        """
+        max_people = int(self.num_people[:self.count].max(initial=0))
+        np.savez_compressed(self.file_path, frame=self.frame[:self.count], num_people=self.num_people[:self.count],
+                            kp=self.kp[:self.count, :max_people])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        # only save complete videos
+        if exc_type is None:
+            self.close()
+
+
+def open_pose_writer(output_format: str, base_path: str, kpt_shape: tuple = (17, 3), expected_frames: int = 0,
+                     max_people: int = 4):
+    """
+    create the pose data writer for the configured output format
+    :param output_format: "npz" or "jsonl"
+    :param base_path: output path without extension
+    :param kpt_shape: shape of the keypoints of a single person
+    :param expected_frames: number of frames expected to be written, used to preallocate the npz buffers
+    :param max_people: number of people per frame to preallocate the npz buffers for
+    :return: NpzPoseWriter or JsonlPoseWriter
+    """
+    if output_format == "npz":
+        return NpzPoseWriter(f"{base_path}.npz", kpt_shape, expected_frames, max_people)
+    if output_format == "jsonl":
+        return JsonlPoseWriter(f"{base_path}.jsonl")
+
+    raise ValueError(f"unsupported pose output format: {output_format}")
@@ -1,7 +1,8 @@
 import os
 import logging
 import psycopg2
-from psycopg2 import sql
+from psycopg2 import sql, errors
+from psycopg2.extras import execute_batch
 from dataclasses import dataclass
 
 logging.basicConfig(
@@ -24,12 +25,27 @@ class VideoProcessingResultFields:
     pose_file_path: str = "N/A"
 
 
+# columns of table video_processing_results, in the order of VideoProcessingResultFields
+INSERT_COLUMNS = ("video_filename", "duration_seconds", "resolution", "codec", "frame_rate", "corrupted",
+                  "pose_file_path")
+
+def row_values(row_data: VideoProcessingResultFields) -> tuple:
+    """
+    convert row data to a tuple of values in the order of INSERT_COLUMNS
+    :param row_data: row data as VideoProcessingResultFields dataclass
+    :return: tuple of column values
+    """
+    return tuple(getattr(row_data, column) for column in INSERT_COLUMNS)
+
+
 class PostgresWrapper:
     """
     wrapper class for handling postgreSQL
     """
     def __init__(self):
         self.connection = None
+        # names of the statements already prepared on the current connection
+        self.prepared_statements = set()
         self.db_connect()
 
     def db_connect(self):
@@ -46,7 +62,9 @@ class PostgresWrapper:
                 password=os.getenv("POSTGRES_PASSWORD", "pose_pass")
             )
             logging.info("successfully connected to database")
+            conn.autocommit = False
             self.connection = conn
+            self.prepared_statements = set()
         except psycopg2.OperationalError as e:
             logging.error(f"failed to connect to postgresSQL due to connection error: {e}")
         except psycopg2.InterfaceError as e:
@@ -67,50 +85,124 @@ class PostgresWrapper:
         except (psycopg2.Error, Exception):
             return False
 
-    def db_insert(self, db_table: str, row_data: VideoProcessingResultFields) -> None:
+    @staticmethod
+    def statement_name(kind: str, db_table: str) -> str:
+        """
+        name of a prepared statement of a table
+        :param kind: "ins" for the insert statement, "upd" for the update statement
+        :param db_table: table name
+        :return: prepared statement name
+        """
+        return f"{kind}_{db_table}"
+
+    def prepare_statements(self, cursor, db_table: str) -> None:
+        """
+        prepare the insert and update statements of the given table once per connection,
+        so they are parsed and planned only once
+        :param cursor: cursor of the current connection
+        :param db_table: table to write into
+        :return: None
+        """
+        names = {self.statement_name(kind, db_table) for kind in ("ins", "upd")}
+        if names <= self.prepared_statements:
+            return
+
+        # both statements take their parameters in the order of INSERT_COLUMNS
+        params = [sql.SQL(f"${i}") for i in range(1, len(INSERT_COLUMNS) + 1)]
+        insert_query = sql.SQL("PREPARE {name} AS INSERT INTO {table} ({columns}) VALUES ({placeholders})").format(
+            name=sql.Identifier(self.statement_name("ins", db_table)),
+            table=sql.Identifier(db_table),
+            columns=sql.SQL(", ").join(map(sql.Identifier, INSERT_COLUMNS)),
+            placeholders=sql.SQL(", ").join(params)
+        )
+        update_query = sql.SQL("PREPARE {name} AS UPDATE {table} SET {assignments}, processed_at = CURRENT_TIMESTAMP "
+                               "WHERE {key} = {key_param}").format(
+            name=sql.Identifier(self.statement_name("upd", db_table)),
+            table=sql.Identifier(db_table),
+            assignments=sql.SQL(", ").join(sql.SQL("{} = {}").format(sql.Identifier(column), param)
+                                           for column, param in zip(INSERT_COLUMNS[1:], params[1:])),
+            key=sql.Identifier(INSERT_COLUMNS[0]),
+            key_param=params[0]
+        )
+        # tracked per statement - a PREPARE that failed must not leave its sibling to be prepared a second time
+        for kind, query in (("ins", insert_query), ("upd", update_query)):
+            name = self.statement_name(kind, db_table)
+            if name not in self.prepared_statements:
+                cursor.execute(query)
+                self.prepared_statements.add(name)
+
+    def execute_query(self, cursor, kind: str, db_table: str) -> str:
+        """
+        EXECUTE query of a prepared statement of the given table, taking the row values as parameters
+        :param cursor: cursor of the current connection
+        :param kind: "ins" for the insert statement, "upd" for the update statement
+        :param db_table: table to write into
+        :return: query string
         """
-        insert into given table given row data
-        :param db_table: table to insert inro
+        return sql.SQL("EXECUTE {name} ({placeholders})").format(
+            name=sql.Identifier(self.statement_name(kind, db_table)),
+            placeholders=sql.SQL(", ").join(sql.Placeholder() * len(INSERT_COLUMNS))
+        ).as_string(cursor)
+
+    def execute_statement(self, cursor, kind: str, db_table: str, row_data: VideoProcessingResultFields) -> None:
+        """
+        execute a prepared statement of the given table for one row
+        :param cursor: cursor of the current connection
+        :param kind: "ins" for the insert statement, "upd" for the update statement
+        :param db_table: table to write into
         :param row_data: row data as VideoProcessingResultFields dataclass
         :return: None
         """
-        logging.info(f"inserting {row_data} into table {db_table}")
+        cursor.execute(self.execute_query(cursor, kind, db_table), row_values(row_data))
+
+    def write_row(self, cursor, db_table: str, row_data: VideoProcessingResultFields) -> None:
+        """
+        insert a row with a plain INSERT, and only update the existing row if the video is already in the table.
+        a savepoint keeps the rest of the transaction intact when the insert fails.
+        :param cursor: cursor of the current connection
+        :param db_table: table to write into
+        :param row_data: row data as VideoProcessingResultFields dataclass
+        :return: None
+        """
+        cursor.execute("SAVEPOINT write_row")
+        try:
+            self.execute_statement(cursor, "ins", db_table, row_data)
+        except errors.UniqueViolation:
+            cursor.execute("ROLLBACK TO SAVEPOINT write_row")
+            self.execute_statement(cursor, "upd", db_table, row_data)
+        cursor.execute("RELEASE SAVEPOINT write_row")
+
+    def db_insert_many(self, db_table: str, rows: list) -> None:
+        """
+        insert into given table all given rows with the prepared insert statement, sent in a few round trips
+        and a single commit. if any of the videos is already in the table, the rows are written one by one instead.
+        :param db_table: table to insert into
+        :param rows: list of row data as VideoProcessingResultFields dataclasses
+        :return: None
+        """
+        # keep the latest result per video, a duplicate would always send the batch to the slow path
+        latest_rows = {row_data.video_filename: row_data for row_data in rows}
+        logging.info(f"inserting {len(latest_rows)} rows into table {db_table}")
 
         try:
             with self.connection.cursor() as cursor:
-                insert_query = sql.SQL(f"""
-                        INSERT INTO {db_table} (
-                            video_filename,
-                            duration_seconds,
-                            resolution,
-                            codec,
-                            frame_rate,
-                            corrupted,
-                            pose_file_path
-                        ) VALUES (%s, %s, %s, %s, %s, %s, %s)
-                        ON CONFLICT (video_filename) DO UPDATE SET
-                            duration_seconds = EXCLUDED.duration_seconds,
-                            resolution = EXCLUDED.resolution,
-                            codec = EXCLUDED.codec,
-                            frame_rate = EXCLUDED.frame_rate,
-                            corrupted = EXCLUDED.corrupted,
-                            pose_file_path = EXCLUDED.pose_file_path,
-                            processed_at = CURRENT_TIMESTAMP
-                        """)
-
-                cursor.execute(insert_query, (
-                    row_data.video_filename,
-                    row_data.duration_seconds,
-                    row_data.resolution,
-                    row_data.codec,
-                    row_data.frame_rate,
-                    row_data.corrupted,
-                    row_data.pose_file_path
-                ))
+                self.prepare_statements(cursor, db_table)
+
+                cursor.execute("SAVEPOINT insert_many")
+                try:
+                    # the EXECUTEs are joined into pages, one round trip per page instead of per row
+                    execute_batch(cursor, self.execute_query(cursor, "ins", db_table),
+                                  [row_values(row_data) for row_data in latest_rows.values()])
+                except errors.UniqueViolation:
+                    logging.info(f"some videos are already in table {db_table}, writing rows one by one")
+                    cursor.execute("ROLLBACK TO SAVEPOINT insert_many")
+                    for row_data in latest_rows.values():
+                        self.write_row(cursor, db_table, row_data)
+                cursor.execute("RELEASE SAVEPOINT insert_many")
 
                 self.connection.commit()
         except Exception as e:
-            logging.error(f"Error inserting video processing result: {e}")
+            logging.error(f"Error inserting video processing results: {e}")
             self.connection.rollback()
         else:
-            logging.info(f"finished inserting video processing result for {row_data.video_filename}")
+            logging.info(f"finished inserting video processing results for {', '.join(latest_rows)}")
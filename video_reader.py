@@ -0,0 +1,237 @@
+import os
+import queue
+import logging
+import threading
+import cv2
+import numpy as np
+import torch
+import torch.nn.functional as F
+
+# optional hardware decode through NVIDIA VideoProcessingFramework
+try:
+    import PyNvCodec as nvc
+    import PytorchNvCodec as pnvc
+except ImportError:
+    nvc = None
+    pnvc = None
+
+# marks the end of the frame stream in the queue
+_END_OF_STREAM = object()
+
+# side of the grayscale thumbnail frames are compared on for scene change detection
+THUMBNAIL_SIZE = 64
+
+
+class ThreadedVideoReader:
+    """
+    reads the frames of a video in a background thread into a bounded queue,
+    so decoding the next frames overlaps with running inference on the current batch
+    """
+    def __init__(self, video_path: str, cap: cv2.VideoCapture, first_frame=None, queue_size: int = 8):
+        self.video_path = video_path
+        self.cap = cap
+        self.first_frame = first_frame
+        self.frames = queue.Queue(maxsize=queue_size)
+        self.stopped = threading.Event()
+        self.error = None
+        self.thread = threading.Thread(target=self._read_frames, daemon=True,
+                                       name=f"reader-{os.path.basename(video_path)}")
+        self.thread.start()
+
+    def _read_frames(self) -> None:
+        """
+        decode frames until the end of the video (or until the reader is closed) and push them into the queue
+        :return: None
+        """
+        try:
+            frame_index = 0
+            if self.first_frame is not None:
+                self._put((frame_index, self.first_frame))
+                self.first_frame = None
+                frame_index += 1
+
+            while not self.stopped.is_set():
+                ret, frame = self.cap.read()
+                if not ret:
+                    break
+                self._put((frame_index, frame))
+                frame_index += 1
+        except Exception as e:
+            logging.error(f"error while reading frames from {self.video_path} - {e}")
+            self.error = e
+        finally:
+            self.cap.release()
+            self._put(_END_OF_STREAM)
+
+    def _put(self, item) -> None:
+        """
+        put an item into the queue, giving up if the reader is closed while the queue is full
+        :param item: (frame index, frame) tuple or the end of stream marker
+        :return: None
+        """
+        while not self.stopped.is_set():
+            try:
+                self.frames.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def __iter__(self):
+        """
+        iterate over the decoded frames
+        :return: generator of (frame index, frame) tuples
+        """
+        while True:
+            item = self.frames.get()
+            if item is _END_OF_STREAM:
+                break
+            yield item
+
+        if self.error is not None:
+            raise self.error
+
+    def close(self) -> None:
+        """
+        stop the reader thread and wait for it to release the video
+        :return: None
+        """
+        self.stopped.set()
+        self.thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class NvdecVideoReader:
+    """
+    decodes a video on the gpu with NVDEC, yielding frames as RGB CHW uint8 cuda tensors
+    so they never have to be copied back to the host before inference
+    """
+    def __init__(self, video_path: str, gpu_id: int = 0):
+        if nvc is None or pnvc is None:
+            raise RuntimeError("PyNvCodec is not installed")
+
+        self.video_path = video_path
+        self.decoder = nvc.PyNvDecoder(video_path, gpu_id)
+        if self.decoder.Format() != nvc.PixelFormat.NV12:
+            raise RuntimeError(f"unsupported NVDEC surface format {self.decoder.Format()}")
+
+        self.width, self.height = self.decoder.Width(), self.decoder.Height()
+        self.to_rgb = nvc.PySurfaceConverter(self.width, self.height, nvc.PixelFormat.NV12,
+                                             nvc.PixelFormat.RGB, gpu_id)
+        self.to_planar = nvc.PySurfaceConverter(self.width, self.height, nvc.PixelFormat.RGB,
+                                                nvc.PixelFormat.RGB_PLANAR, gpu_id)
+
+        color_space, color_range = self.decoder.ColorSpace(), self.decoder.ColorRange()
+        if color_space == nvc.ColorSpace.UNSPEC:
+            color_space = nvc.ColorSpace.BT_601
+        if color_range == nvc.ColorRange.UDEF:
+            color_range = nvc.ColorRange.MPEG
+        self.color_context = nvc.ColorspaceConversionContext(color_space, color_range)
+
+    def __iter__(self):
+        """
+        iterate over the decoded frames
+        :return: generator of (frame index, RGB CHW uint8 cuda tensor) tuples
+        """
+        frame_index = 0
+        while True:
+            surface = self.decoder.DecodeSingleSurface()
+            if surface.Empty():
+                break
+
+            planar = self.to_planar.Execute(self.to_rgb.Execute(surface, self.color_context), self.color_context)
+            if planar.Empty():
+                break
+
+            plane = planar.PlanePtr()
+            frame = pnvc.makefromDevicePtrUint8(plane.GpuMem(), plane.Width(), plane.Height(), plane.Pitch(),
+                                                plane.ElemSize())
+            frame.resize_(3, self.height, self.width)
+            yield frame_index, frame
+            frame_index += 1
+
+    def close(self) -> None:
+        """
+        release the decoder
+        :return: None
+        """
+        self.decoder = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class FrameSampler:
+    """
+    drops redundant frames before inference - keeps every frame_stride-th frame, and of those only frames that
+    differ enough from the last kept frame (mean absolute difference of 64x64 grayscale thumbnails)
+    """
+    def __init__(self, frame_stride: int = 1, scene_diff_threshold: float = 0.0):
+        self.frame_stride = max(1, frame_stride)
+        self.scene_diff_threshold = scene_diff_threshold
+        self.last_thumbnail = None
+
+    @staticmethod
+    def thumbnail(frame) -> np.ndarray:
+        """
+        downsample a frame to a small grayscale image
+        :param frame: BGR HWC numpy frame or RGB CHW uint8 tensor
+        :return: THUMBNAIL_SIZE x THUMBNAIL_SIZE float32 array
+        """
+        if isinstance(frame, torch.Tensor):
+            gray = frame.float().mean(0, keepdim=True)[None]
+            return F.interpolate(gray, size=(THUMBNAIL_SIZE, THUMBNAIL_SIZE), mode='area')[0, 0].cpu().numpy()
+
+        small = cv2.resize(frame, (THUMBNAIL_SIZE, THUMBNAIL_SIZE), interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY).astype(np.float32)
+
+    def keep(self, frame_index: int, frame) -> bool:
+        """
+        decide whether a frame should go through pose detection
+        :param frame_index: index of the frame in the video
+        :param frame: the decoded frame
+        :return: True if the frame should be kept
+        """
+        if frame_index % self.frame_stride:
+            return False
+        if self.scene_diff_threshold <= 0:
+            return True
+
+        thumbnail = self.thumbnail(frame)
+        if self.last_thumbnail is not None and \
+                cv2.absdiff(thumbnail, self.last_thumbnail).mean() <= self.scene_diff_threshold:
+            return False
+
+        self.last_thumbnail = thumbnail
+        return True
+
+
+def open_video_reader(video_path: str, cap: cv2.VideoCapture, first_frame, queue_size: int, use_nvdec: bool = False):
+    """
+    open a frame reader for the video, preferring NVDEC and falling back to OpenCV decode.
+    the reader takes ownership of the capture and releases it.
+    :param video_path: full path of the video file
+    :param cap: opened capture of the video file, positioned after first_frame
+    :param first_frame: first frame already read from the capture, or None
+    :param queue_size: size of the frame queue for the OpenCV reader
+    :param use_nvdec: whether to try hardware decoding first
+    :return: NvdecVideoReader or ThreadedVideoReader
+    """
+    if use_nvdec:
+        try:
+            reader = NvdecVideoReader(video_path)
+        except Exception as e:
+            logging.info(f"NVDEC unavailable for {video_path}, falling back to OpenCV decode - {e}")
+        else:
+            # NVDEC demuxes the file itself, the cpu capture is not needed anymore
+            cap.release()
+            return reader
+
+    return ThreadedVideoReader(video_path, cap, first_frame, queue_size=queue_size)